@@ -1,26 +1,55 @@
 
+import os
 import sys 
-from constraint import Problem, ExactSumConstraint
+from functools import lru_cache
 
 
 # En este fichero se implementa la solucion a la primera parte de la practica
 
 
+# Tabla con la representacion de cada celda de la rejilla (las filas leidas son bytes, cada celda es su codigo)
+CELDAS = {
+    ord('.'): '   |', # Celda vacía
+    ord('X'): ' X |', # Disco negro
+    ord('O'): ' O |', # Disco blanco
+    # estos casos son para después de resolver
+    1: ' X |', # Disco negro
+    0: ' O |', # Disco blanco
+}
+
+# Tabla de traduccion de los digitos binarios '0'/'1' a los valores 0/1
+DIGITOS_A_BITS = bytes.maketrans(b'01', b'\x00\x01')
+
+# Tablas de traduccion de cada celda del fichero a un digito binario:
+# CELDAS_FIJAS marca con '1' las celdas pre-asignadas y CELDAS_NEGRAS los discos negros
+CELDAS_FIJAS = bytes(ord('1') if celda in b'XO' else ord('0') for celda in range(256))
+CELDAS_NEGRAS = bytes(ord('1') if celda == ord('X') else ord('0') for celda in range(256))
+
+
 # Funcion que lee el fichero de entrada y devuelve la matriz del problema.
+# Si el mismo fichero se vuelve a leer sin haber cambiado (misma fecha de modificacion) se reutiliza el tablero ya leido
 def leer_instancia(fichero_entrada):
+    modificado = os.stat(fichero_entrada).st_mtime_ns
+    # Se devuelve una copia de la lista para que quien llama pueda modificarla sin tocar la cache
+    return list(_leer_instancia(fichero_entrada, modificado))
+
 
-    # Abre el fichero en modo lectura de forma segura (se cierra solo al acabar)
-    with open(fichero_entrada, 'r') as f:
-        lineas = f.read().strip().split('\n') # Lee todas las líneas del archivo
+# Funcion auxiliar que lee y procesa el fichero. La fecha de modificacion forma parte de la clave de la cache
+@lru_cache(maxsize=32)
+def _leer_instancia(fichero_entrada, modificado):
+
+    # Abre el fichero en modo lectura binaria de forma segura (se cierra solo al acabar)
+    with open(fichero_entrada, 'rb') as f:
+        lineas = f.read().strip().split(b'\n') # Lee todas las líneas del archivo
     
     matriz = [] # Inicializa una lista donde se guardará el tablero procesado
     # bucle que recorre todas las lineas
     for linea in lineas:
-        # Convierte la fila en una lista de caracteres
-        fila = list(linea.strip()) 
+        # Cada fila se queda como bytes: se indexa igual que una lista pero sin crear un objeto por celda
+        fila = linea.strip()
         matriz.append(fila) # Añade cada fila a la matriz
 
-    return matriz # Devuelve la matriz completa
+    return tuple(matriz) # Devuelve la matriz completa
 
 
 
@@ -33,21 +62,9 @@ def formato_rejilla(matriz, n):
     
     # bucle que se repite para cada fila en la matriz para pintar el rectangulo
     for fila in matriz:
-        contenido = '|'
-        for celda in fila:
-            if celda == '.':
-                contenido += '   |' # Celda vacía
-            elif celda == 'X':
-                contenido += ' X |' # Disco negro
-            elif celda == 'O':
-                contenido += ' O |' # Disco blanco
-            # estos casos son para después de resolver
-            elif celda == 1:
-                contenido += ' X |' # Disco negro
-            elif celda == 0:
-                contenido += ' O |' # Disco blanco
-            else:
-                contenido += ' ' + str(celda) + ' |'
+        # Cada celda se traduce con una unica consulta a la tabla CELDAS y la fila se une de una vez
+        # (join sobre una lista evita que tenga que materializar antes un generador)
+        contenido = '|' + ''.join([CELDAS.get(celda) or f' {chr(celda)} |' for celda in fila])
         lineas.append(contenido)
         lineas.append(separador)
     
@@ -55,124 +72,283 @@ def formato_rejilla(matriz, n):
 
 
 
-# Verifica que tres valores consecutivos no sean todos iguales (todos blancos o todos negros).
-# Esta restricción asegura que no haya más de dos discos del mismo color consecutivos en una fila o columna.
-def restriccion_no_tres_consecutivos(v1, v2, v3):
-    suma = v1 + v2 + v3 # No pueden ser los tres iguales (ni todos 0, ni todos 1)
-    return suma >= 1 and suma <= 2
+# Funcion que genera todos los patrones validos de una fila de longitud n, sin tener en cuenta las celdas fijas.
+# Cada patron es un entero cuyo bit j es el valor de la celda j (1=negro, 0=blanco).
+# Se recorre un automata cuyos estados son (posicion, unos colocados, ultimo valor, longitud de la racha),
+# de forma que solo se generan filas equilibradas y sin tres iguales seguidos, sin probar los 2^n enteros.
+# El resultado se guarda en cache por n, ya que solo depende del tamaño del tablero.
+@lru_cache(maxsize=None)
+def generar_patrones_validos(n):
+    max_unos = n // 2 # Numero de discos negros que debe tener la fila
+    max_ceros = n - max_unos # Numero de discos blancos que debe tener la fila
+
+    # Devuelve los sufijos validos desde la posicion i (se memoiza por estado del automata)
+    @lru_cache(maxsize=None)
+    def sufijos(i, unos, ultimo, racha):
+        # Al llegar al final, la fila solo es valida si tiene exactamente n/2 unos
+        if i == n:
+            return (0,) if unos == max_unos else ()
+
+        patrones = []
+        bit = 1 << i
+        for valor in (0, 1):
+            # No puede haber tres valores iguales seguidos
+            nueva_racha = racha + 1 if valor == ultimo else 1
+            if nueva_racha == 3:
+                continue
+            # Se poda en cuanto sobran unos o ceros
+            nuevos_unos = unos + valor
+            if nuevos_unos > max_unos or i + 1 - nuevos_unos > max_ceros:
+                continue
+            for resto in sufijos(i + 1, nuevos_unos, valor, nueva_racha):
+                patrones.append(resto | bit if valor else resto)
+        return tuple(patrones)
+
+    return sufijos(0, 0, -1, 0)
+
+
+# Funcion que se queda con los patrones compatibles con las celdas pre-asignadas de una fila.
+# Filas con las mismas celdas fijas (en este u otro tablero del mismo tamaño) comparten sus candidatos.
+@lru_cache(maxsize=None)
+def enumerar_filas(n, mascara_fija, valor_fijo):
+    return tuple(patron for patron in generar_patrones_validos(n) if (patron & mascara_fija) == valor_fijo)
 
 
 # Funcion que crea el modelo de satisfacción de restricciones para BINAIRO.
 def crear_modelo(matriz):
     """
     El modelo sigue la siguiente formalización:
-    - Variables: x_ij para cada celda (i,j)
-    - Dominios: {0,1} para celdas vacías, valor fijo para celdas pre-asignadas
+    - Variables: una por fila, cuyo valor es el patron de bits de la fila completa
+    - Dominios: patrones que cumplen C1 y C3 y respetan las celdas pre-asignadas
     - Restricciones: 
-            C1 (equilibrio filas), 
-            C2 (equilibrio columnas),
-            C3 (no tres consecutivos en filas),
-            C4 (no tres consecutivos en columnas)
+            C1 (equilibrio filas) y C3 (no tres consecutivos en filas): implicitas en el dominio,
+            C2 (equilibrio columnas) y C4 (no tres consecutivos en columnas): se comprueban
+            columna a columna con operaciones de bits durante la busqueda
     """
     n = len(matriz) # Obtiene el tamaño de la rejilla 
-    problem = Problem() # Crea una instancia vacia del solucionador
-    
-    # Cada variable se identifica como (i, j) representando la celda en fila i, columna j
+    dominios = [] # Lista con los patrones candidatos de cada fila
+
     for i in range(n):
+        # Se construyen las mascaras con las celdas pre-asignadas de la fila traduciendola entera a binario
+        # (se invierte para que la celda j sea el bit j)
+        fila = matriz[i][::-1]
+        mascara_fija = int(fila.translate(CELDAS_FIJAS), 2) # Celdas con un disco pre-asignado
+        valor_fijo = int(fila.translate(CELDAS_NEGRAS), 2) # Discos negros pre-asignados
+        # Patrones que cumplen C1 y C3 y respetan las celdas fijas
+        dominios.append(enumerar_filas(n, mascara_fija, valor_fijo))
+
+    return dominios
+
+
+# Funcion que filtra los dominios antes de la busqueda (comprobacion hacia delante sobre C2 y C4).
+# Una celda esta forzada si todos los candidatos de su fila coinciden en ella. Sobre las celdas forzadas:
+# - C2: si los negros forzados de una columna ya suman n/2, el resto de celdas de la columna deben ser blancas
+#   (y lo mismo con los blancos)
+# - C4: dos negros forzados seguidos en una columna (o separados por una celda) obligan a que las celdas de
+#   los extremos (o la del medio) sean blancas, y lo mismo con los blancos. Con mascaras de bits se revisan
+#   a la vez todas las columnas para cada par de filas vecinas
+# Al filtrar pueden aparecer nuevas celdas forzadas, por lo que se repite hasta que los dominios no cambian.
+# Devuelve None si algun dominio se queda vacio.
+def propagar_dominios(dominios, n):
+    max_unos = n // 2
+    max_ceros = n - max_unos
+    completo = (1 << n) - 1
+    dominios = list(dominios)
+
+    cambiado = True
+    while cambiado:
+        cambiado = False
+
+        # Se calculan las celdas forzadas de cada fila (con dos filas vacias a cada lado para C4)
+        forzados_unos = [0, 0]
+        forzados_ceros = [0, 0]
+        for patrones in dominios:
+            unos = completo
+            ceros = completo
+            for patron in patrones:
+                unos &= patron
+                ceros &= ~patron
+            forzados_unos.append(unos)
+            forzados_ceros.append(ceros)
+        forzados_unos += [0, 0]
+        forzados_ceros += [0, 0]
+
+        # Se buscan las columnas saturadas de negros o de blancos
+        saturadas_unos = 0
+        saturadas_ceros = 0
         for j in range(n):
-            celda = matriz[i][j]
-            if celda == '.':
-                # Celda vacía: dominio {0, 1} donde 0=blanco, 1=negro
-                problem.addVariable((i, j), [0, 1])
-            elif celda == 'X':
-                # Disco negro pre-asignado
-                problem.addVariable((i, j), [1])
-            elif celda == 'O':
-                # Disco blanco pre-asignado
-                problem.addVariable((i, j), [0])
-    
-    # C1: Equilibrio en cada fila
-    # La suma de valores en cada fila debe ser exactamente n/2
-    for i in range(n):
-        variables_fila = [(i, j) for j in range(n)]
-        problem.addConstraint(ExactSumConstraint(n // 2), variables_fila)
-    
-    # C2: Equilibrio en cada columna
-    # La suma de valores en cada columna debe ser exactamente n/2
-    for j in range(n):
-        variables_columna = [(i, j) for i in range(n)]
-        problem.addConstraint(ExactSumConstraint(n // 2), variables_columna)
-    
-    # C3: No más de dos consecutivos en filas
-    # Para cada triplete horizontal, no pueden ser todos iguales
-    for i in range(n):
-        for j in range(n - 2):
-            variables_triplete = [(i, j), (i, j + 1), (i, j + 2)]
-            problem.addConstraint(restriccion_no_tres_consecutivos, variables_triplete)
-    
-    # C4: No más de dos consecutivos en columnas
-    # Para cada triplete vertical, no pueden ser todos iguales
-    for j in range(n):
-        for i in range(n - 2):
-            variables_triplete = [(i, j), (i + 1, j), (i + 2, j)]
-            problem.addConstraint(restriccion_no_tres_consecutivos, variables_triplete)
-    
-    return problem
+            unos = sum((forzados >> j) & 1 for forzados in forzados_unos)
+            ceros = sum((forzados >> j) & 1 for forzados in forzados_ceros)
+            if unos > max_unos or ceros > max_ceros:
+                return None
+            if unos == max_unos:
+                saturadas_unos |= 1 << j
+            if ceros == max_ceros:
+                saturadas_ceros |= 1 << j
+
+        # Cada fila solo conserva los patrones que respetan las celdas deducidas
+        for k in range(n):
+            fu = forzados_unos[k:k + 5] # Filas k-2..k+2
+            fc = forzados_ceros[k:k + 5]
+            prohibido = (saturadas_unos & ~fu[2]) | (fu[0] & fu[1]) | (fu[1] & fu[3]) | (fu[3] & fu[4])
+            obligado = (saturadas_ceros & ~fc[2]) | (fc[0] & fc[1]) | (fc[1] & fc[3]) | (fc[3] & fc[4])
+            filtrado = [patron for patron in dominios[k]
+                        if not patron & prohibido and (patron & obligado) == obligado]
+            if not filtrado:
+                return None
+            if len(filtrado) != len(dominios[k]):
+                dominios[k] = filtrado
+                cambiado = True
+
+    return dominios
+
+
+# Funcion que resuelve el modelo mediante una busqueda en profundidad fila a fila.
+# Devuelve el numero de soluciones y la primera encontrada (lista de patrones de sus filas, o None si no hay).
+# Solo se guarda la primera solucion: el resto unicamente se cuentan.
+# Si se pasa un limite, la busqueda se detiene al llegar a ese numero de soluciones (el numero devuelto es entonces
+# una cota inferior), para no recorrer todas las soluciones de los tableros con muchas, cuyo numero crece exponencialmente
+def resolver_modelo(dominios, n, limite=None):
+    max_unos = n // 2
+    max_ceros = n - max_unos
+    completo = (1 << n) - 1 # Mascara con las n columnas a 1
+    unos_col = [0] * n # Numero de discos negros colocados en cada columna
+    filas = [] # Patrones elegidos hasta el momento
+    num_soluciones = 0
+    primera = None
 
+    # Se filtran los dominios con las celdas pre-asignadas antes de empezar
+    dominios = propagar_dominios(dominios, n)
+    if dominios is None:
+        return num_soluciones, primera
 
-# Solucion que convierte el diccionario de solucion a formato matriz
-def solucion_a_matriz(dic, n):
-    matriz = [[0 for _ in range(n)] for _ in range(n)] # Inicializa una matriz llena de ceros
-    # Itera sobre la matriz rellenando las posiciones con ceros o unos como corresponda
-    for (i, j), valor in dic.items():
-        matriz[i][j] = valor
-    return matriz
+    # Se calculan las columnas cuyo valor esta forzado en cada fila (todos sus candidatos coinciden)
+    # y se acumulan de abajo a arriba: pendientes_unos[i][j] es el numero de filas posteriores a i
+    # con un disco negro forzado en la columna j (y lo mismo para los blancos)
+    pendientes_unos = [None] * n
+    pendientes_ceros = [None] * n
+    acumulado_unos = [0] * n
+    acumulado_ceros = [0] * n
+    for i in range(n - 1, -1, -1):
+        pendientes_unos[i] = list(acumulado_unos)
+        pendientes_ceros[i] = list(acumulado_ceros)
+        forzados_unos = completo
+        forzados_ceros = completo
+        for patron in dominios[i]:
+            forzados_unos &= patron
+            forzados_ceros &= ~patron
+        for j in range(n):
+            acumulado_unos[j] += (forzados_unos >> j) & 1
+            acumulado_ceros[j] += (forzados_ceros >> j) & 1
+
+    # Devuelve True cuando se alcanza el limite de soluciones, para cortar la busqueda
+    def resolver(i, anterior, penultima):
+        nonlocal num_soluciones, primera
+        # Si se han colocado todas las filas se ha encontrado una solucion
+        if i == n:
+            if primera is None:
+                primera = list(filas)
+            num_soluciones += 1
+            return num_soluciones == limite
+
+        # C2 (consistencia de limites): una columna no admite mas negros si los ya colocados mas los que
+        # estan forzados en las filas siguientes alcanzan n/2, y lo mismo ocurre con los blancos
+        prohibido = 0 # Columnas donde la nueva fila debe tener un 0
+        obligado = 0 # Columnas donde la nueva fila debe tener un 1
+        pendientes_unos_fila = pendientes_unos[i]
+        pendientes_ceros_fila = pendientes_ceros[i]
+        for j in range(n):
+            # Comprobacion hacia delante: como no puede haber tres iguales seguidos, en las filas que quedan (esta
+            # incluida) una columna admite como mucho dos negros por cada blanco que le falte, mas dos, y lo mismo
+            # al reves. Si alguna columna ya no se puede completar, ninguna fila de aqui en adelante da solucion
+            faltan_unos = max_unos - unos_col[j]
+            faltan_ceros = max_ceros - i + unos_col[j]
+            if faltan_unos > 2 * faltan_ceros + 2 or faltan_ceros > 2 * faltan_unos + 2:
+                return False
+            if unos_col[j] + pendientes_unos_fila[j] >= max_unos:
+                prohibido |= 1 << j
+            if i - unos_col[j] + pendientes_ceros_fila[j] >= max_ceros:
+                obligado |= 1 << j
+
+        # C4: tras dos negros (o dos blancos) seguidos en una columna el siguiente debe ser distinto
+        if i >= 2:
+            prohibido |= anterior & penultima
+            obligado |= completo & ~(anterior | penultima)
+
+        for patron in dominios[i]:
+            # Se comprueban todas las columnas a la vez con operaciones de bits
+            if patron & prohibido or (patron & obligado) != obligado:
+                continue
+            for j in range(n):
+                unos_col[j] += (patron >> j) & 1
+            filas.append(patron)
+            if resolver(i + 1, patron, anterior):
+                return True
+            filas.pop()
+            for j in range(n):
+                unos_col[j] -= (patron >> j) & 1
+        return False
+
+    resolver(0, 0, 0)
+    return num_soluciones, primera
+
+
+# Solucion que convierte la lista de patrones de la solucion a formato matriz
+def solucion_a_matriz(solucion, n):
+    formato = f'0{n}b' # Representacion binaria con n digitos (el bit 0 queda al final)
+    # Cada fila se convierte de golpe: se escribe en binario, se invierte para que la columna j sea el bit j
+    # y se traducen los digitos '0'/'1' a los valores 0/1, sin recorrer las celdas una a una en Python.
+    # Como en leer_instancia, cada fila se queda como bytes (un byte por celda)
+    return [format(patron, formato)[::-1].encode().translate(DIGITOS_A_BITS) for patron in solucion]
 
 
 
 # Función principal que ejecuta el solver de BINAIRO.
+# Por defecto solo se distingue entre 0, 1 o al menos 2 soluciones; con --todas se cuentan todas
 def main():
     # Verificación de argumentos
-    if len(sys.argv) != 3:
-        print("Uso: python3 parte-1.py <fichero-entrada.in <fichero-salida.out>")
+    if len(sys.argv) not in (3, 4) or (len(sys.argv) == 4 and sys.argv[3] != '--todas'):
+        print("Uso: python3 parte-1.py <fichero-entrada.in <fichero-salida.out> [--todas]")
         sys.exit(1)
     
     # Recibe los archivos de entrada y salida
     fichero_entrada = sys.argv[1]
     fichero_salida = sys.argv[2]
+    # Sin --todas la busqueda para en la segunda solucion
+    limite = None if len(sys.argv) == 4 else 2
     
     # Se llama a la funcion auxiliar leer_instancia para obtener el "tablero"
     matriz = leer_instancia(fichero_entrada)
     n = len(matriz) # Calcula las dimensiones del tablero
     
-    # Muestra la instancia en pantalla
-    print(formato_rejilla(matriz, n))
+    # Muestra la instancia en pantalla (la rejilla se guarda para escribirla luego en el fichero)
+    rejilla = formato_rejilla(matriz, n)
+    print(rejilla)
     
     # Creaa y resuelve el modelo CSP
-    problem = crear_modelo(matriz)
+    dominios = crear_modelo(matriz)
     
-    # Obtiene todas las soluciones
-    soluciones = problem.getSolutions()
-    num_soluciones = len(soluciones)
+    # Cuenta las soluciones (hasta el limite), quedandose solo con la primera
+    num_soluciones, solucion = resolver_modelo(dominios, n, limite)
     
     # Muestra número de soluciones
     if num_soluciones == 1:
         print("Una solución encontrada")
+    elif num_soluciones == limite:
+        print(f"Al menos {num_soluciones} soluciones encontradas (usa --todas para contarlas todas)")
     else:
         print(f"{num_soluciones} soluciones encontradas")
     
-    # Escribe en el fichero de salida
+    # Se construye la salida completa: primero la instancia original y luego una solución (si existe)
+    salida = [rejilla, '\n\n']
+    if num_soluciones > 0:
+        matriz_solucion = solucion_a_matriz(solucion, n)
+        salida.append(formato_rejilla(matriz_solucion, n))
+        salida.append('\n')
+    
+    # Escribe en el fichero de salida con una sola escritura
     with open(fichero_salida, 'w') as f:
-        # Primero escribir la instancia original
-        f.write(formato_rejilla(matriz, n))
-        f.write('\n\n')
-        
-        # Luego, escribie una solución (si existe)
-        if num_soluciones > 0:
-            solucion = soluciones[0]
-            matriz_solucion = solucion_a_matriz(solucion, n)
-            f.write(formato_rejilla(matriz_solucion, n))
-            f.write('\n')
+        f.write(''.join(salida))
 
 
 if __name__ == '__main__':
@@ -1,16 +1,37 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from heapq import heappush, heappop
+from array import array
+
+
+# Bits de las claves empaquetadas de ListaAbiertaHeap y ListaAbiertaPerezosa
+BITS_G = 40 # g < 2^40
+BITS_NODO = 32 # id de nodo < 2^32
+MASCARA_G = (1 << BITS_G) - 1
+MASCARA_NODO = (1 << BITS_NODO) - 1
+
 
 # Clase que implementa toda la logica necesaria para una lista abierta que se usa en los algoritmos de A* y Dikstra
-# Se implementa con dial's bucket en con set() en vez de con una lista normal para aumentar la eficiencia de las actualizaciones
+# Se implementa con dial's bucket, donde cada bucket es una lista de nodos con borrado perezoso: al mejorar un nodo
+# no se quita de su bucket antiguo, sino que se deja ahi y se descarta al extraerlo si su f ya no coincide con la de entrada
+# La f y la g de cada nodo se guardan en arrays indexados por el id del nodo (enteros densos 1..n como en DIMACS)
+# en lugar de en un diccionario de tuplas, para no crear una tupla por cada actualizacion
 # Sus funciones principales son insertar y extraer_minimo, aunque tambien contiene funciones secundarias
 class ListaAbierta:
+
+    # Atributos fijos: se guardan en slots en vez de en un diccionario por instancia, lo que tambien agiliza su acceso
+    __slots__ = ('buckets', 'entrada_f', 'entrada_g', 'en_abierta', 'num_abiertos', 'min_f', '_fheap')
     
-    def __init__(self):
+    def __init__(self, num_nodos):
+        # num_nodos: Mayor id de nodo que se puede insertar.
         self.buckets = {}  # Diccionario donde las claves son el coste f y los valores son los nodos que tienen esa f
-        self.entrada = {}  # Diccionario auxiliar para comprobar si un nodo esta en la lista
+        self.entrada_f = array('q', [0]) * (num_nodos + 1) # f de cada nodo de la lista
+        self.entrada_g = array('q', [0]) * (num_nodos + 1) # g de cada nodo de la lista
+        self.en_abierta = bytearray(num_nodos + 1) # 1 si el nodo esta en la lista
+        self.num_abiertos = 0 # Numero de nodos en la lista
         self.min_f = float('inf') # la variable que rastrea el valor minimo de f se inicializa como infinito
+        self._fheap = [] # Monticulo con las f de los buckets creados, para encontrar el siguiente minimo sin recorrer todos
     
 
     # Funcion que permite insertar un nuevo nodo o actualizar uno existente si 
@@ -21,108 +42,267 @@ class ListaAbierta:
         # h: Valor heurístico desde el nodo hasta el objetivo.
         
         # Se calcula la prioridad f del nodo sumando su coste acumulado desde el inicio y su heuristica
-        f = int(g + h)  # Asegurar que f es entero para indexar buckets
+        # g y h deben ser enteros (los costes DIMACS lo son y A* trunca la heuristica al calcularla) para indexar buckets
+        f = g + h
         
-        # Comprobamos si el nodo ya existe en la lista de entrada
-        if nodo in self.entrada:
-            # Si existe en entrada, cogemos los valores del nodo en la lista
-            f_anterior, g_anterior = self.entrada[nodo]
-            
+        # Comprobamos si el nodo ya existe en la lista
+        if self.en_abierta[nodo]:
             # Si el coste del camino de la lista es mejor que el nuevo, no hacemos nada
-            if g_anterior <= g:
+            if self.entrada_g[nodo] <= g:
                 return
             
-            # Verificamos que el bucket antiguo exista
-            if f_anterior in self.buckets:
-                # se eliminina el nodo antiguo del buvket antiguo 
-                self.buckets[f_anterior].discard(nodo)  # Se utiliza discard en vez de buscar en una lista porque es más rapido O(1)
-                
-                # Si el bucket queda vacío tras eliminar el nodo antiguo, lo eliminamos
-                if not self.buckets[f_anterior]:
-                    del self.buckets[f_anterior]
-                    # Si era el mínimo, recalcular
-                    if f_anterior == self.min_f:
-                        # Si quedan buckets buscamos el nuevo minimo, y si no lo encontramos, volvemos a infinito
-                        if self.buckets:
-                            self.min_f = min(self.buckets.keys())
-                        else:
-                            self.min_f = float('inf')
+            # La copia del bucket antiguo no se toca: queda obsoleta y se descartara al extraerla
+        else:
+            self.en_abierta[nodo] = 1
+            self.num_abiertos += 1
         
-        # Si el nodo no exiete en la lista de entradas:
-        # Si no existe un bucket f, se crea para poder almacenar l nuevo nodo
-        if f not in self.buckets:
-            self.buckets[f] = set()  # Se usa set en lugar de deque porque es mas eficiente
+        # Si no existe un bucket f, se crea para poder almacenar el nuevo nodo
+        bucket = self.buckets.get(f)
+        if bucket is None:
+            bucket = self.buckets[f] = []  # Una lista ocupa menos que un set y append/pop no calculan hashes
+            heappush(self._fheap, f)  # Se registra la f del nuevo bucket en el monticulo
         
-        # Se almacena el nuevo nodo tanto en buckets como en entrada
-        self.buckets[f].add(nodo)  # Se usa add en lugar de append porque es mas eficiente
-        self.entrada[nodo] = (f, g)
+        # Se almacena el nuevo nodo tanto en buckets como en los arrays de entrada
+        bucket.append(nodo)
+        self.entrada_f[nodo] = f
+        self.entrada_g[nodo] = g
         
         # Se actualiza el min_f si es necesario
         if f < self.min_f:
             self.min_f = f
+
+
+    # Funcion que inserta (o mejora) de una vez varios nodos, dados como tuplas (nodo, g, h)
+    # Hace lo mismo que llamar a insertar con cada uno, pero con los atributos en variables locales y una sola llamada
+    # por expansion en vez de una por sucesor
+    def insertar_muchos(self, nodos):
+        buckets = self.buckets
+        en_abierta = self.en_abierta
+        entrada_f = self.entrada_f
+        entrada_g = self.entrada_g
+        min_f = self.min_f
+        for nodo, g, h in nodos:
+            f = g + h
+            if en_abierta[nodo]:
+                # Si el coste del camino de la lista es mejor que el nuevo, se pasa al siguiente
+                if entrada_g[nodo] <= g:
+                    continue
+            else:
+                en_abierta[nodo] = 1
+                self.num_abiertos += 1
+            bucket = buckets.get(f)
+            if bucket is None:
+                bucket = buckets[f] = []
+                heappush(self._fheap, f)
+            bucket.append(nodo)
+            entrada_f[nodo] = f
+            entrada_g[nodo] = g
+            if f < min_f:
+                min_f = f
+        self.min_f = min_f
     
 
     # Funcion que extrae el nodo con el menor coste f para expandirlo
     def extraer_minimo(self):
-        # Si buckets está vacio, se devuelve none, ya que no hay nada que devolver
-        if not self.buckets:
-            return None
-        
-        # Bucle while para asegurar que encontramos un nodo usando min_f
-        while self.min_f in self.buckets:
-            # Obtiene todos los nodos cuya f sea la minima
-            bucket = self.buckets[self.min_f]
-
-            # Si el bucket tiene elementos:
-            if bucket:
-                # Se extrae uno de los nodos contenidos en el bucket
-                nodo = bucket.pop()  # O(1) con set.pop()
-                
-                # Si tras sacar el nodo anterior el bucket queda vacío, se elimina
-                if not bucket:
-                    del self.buckets[self.min_f]
-                
-                # Obtener el g del diccionario y eliminar entrada
-                if nodo in self.entrada:
-                    _, g = self.entrada[nodo]
-                    del self.entrada[nodo]
-                    
-                    # Actualizar min_f en el caso de que fuese necesario
-                    if not self.buckets:
-                        self.min_f = float('inf')
-                    elif self.min_f not in self.buckets:
-                        self.min_f = min(self.buckets.keys())
-                    
-                    # Al final, se devuelve el nodo y su coste acumulado g
-                    return nodo, g
+        en_abierta = self.en_abierta
+        # Se repite hasta encontrar un nodo vigente (las copias obsoletas se descartan)
+        while self.buckets:
+            # Los buckets vacios se eliminan siempre, por lo que el bucket de min_f tiene al menos un nodo
+            f = self.min_f
+            bucket = self.buckets[f]
+            # Se extrae uno de los nodos contenidos en el bucket
+            nodo = bucket.pop()  # O(1) al sacar del final de la lista
             
-            # Si el bucket está vacio, se elimina de la lista, aunque esto no deberia pasar
-            del self.buckets[self.min_f]
-            # Se actualiza min_f en base a si existe el diccionario buckets tras eliminar el nodo anterior
-            if self.buckets:
-                self.min_f = min(self.buckets.keys())
-            else:
-                self.min_f = float('inf')
-                break
+            # Si tras sacar el nodo el bucket queda vacío, se elimina y se actualiza min_f
+            if not bucket:
+                del self.buckets[f]
+                self._actualizar_min_f()
+            
+            # El nodo solo es vigente si sigue en la lista con la f de este bucket
+            if en_abierta[nodo] and self.entrada_f[nodo] == f:
+                # Se saca de la lista y se devuelve el nodo y su coste acumulado g
+                en_abierta[nodo] = 0
+                self.num_abiertos -= 1
+                return nodo, self.entrada_g[nodo]
         
-        # Si no se ha encontrado nada, no se devuelve nada
+        # Si buckets está vacio, se devuelve none, ya que no hay nada que devolver
         return None
     
+    # Funcion que recalcula min_f cuando se elimina el bucket minimo
+    # En vez de recorrer todas las claves con min(), se descartan de la cima del monticulo las f cuyos buckets ya no existen
+    def _actualizar_min_f(self):
+        fheap = self._fheap
+        while fheap and fheap[0] not in self.buckets:
+            heappop(fheap)
+        # Si quedan buckets la cima es el nuevo minimo, y si no, se vuelve a infinito
+        self.min_f = fheap[0] if fheap else float('inf')
+    
     # Funcion que verifica si la lista abierta está vacia 
     def esta_vacia(self):
-        return len(self.entrada) == 0
+        return self.num_abiertos == 0
     
-    # Funcion que verifica si una lis
+    # Funcion que verifica si un nodo esta en la lista abierta
     def contiene(self, nodo):
-        return nodo in self.entrada
+        return self.en_abierta[nodo] == 1
     
     # Funcion que obtiene el valor del coste acumulado g de un nodo en la lista abierta
     def obtener_g(self, nodo):
-        if nodo in self.entrada:
-            _, g = self.entrada[nodo]
-            return g
+        if self.en_abierta[nodo]:
+            return self.entrada_g[nodo]
         return None
     
     # Funcion que devuelve el numero de nodos de la lista abierta
     def __len__(self):
-        return len(self.entrada)
\ No newline at end of file
+        return self.num_abiertos
+
+
+# Clase que implementa la lista abierta con un monticulo binario (heapq)
+# Cada entrada del monticulo es un unico entero que empaqueta (f, nodo, g): f en los bits altos, luego el nodo (32 bits) y la g
+# (40 bits) en los bajos. Asi heapq compara enteros en vez de tuplas, y el orden es por f y, a igual f, por id de nodo.
+# Al mejorar un nodo no se busca su entrada antigua en el monticulo: se mete una nueva y la antigua se descarta al extraerla
+# porque ya no coincide con la clave guardada en entrada
+class ListaAbiertaHeap:
+
+    # Atributos fijos guardados en slots (ver ListaAbierta)
+    __slots__ = ('monticulo', 'entrada')
+
+    def __init__(self):
+        self.monticulo = [] # Monticulo de claves empaquetadas
+        self.entrada = {} # Diccionario con la clave vigente de cada nodo de la lista
+
+
+    # Funcion que permite insertar un nuevo nodo o actualizar uno existente si ha encontrado un camino mejor
+    def insertar(self, nodo, g, h):
+        entrada = self.entrada # Se guarda en una variable local para no buscar el atributo dos veces
+        # Si el coste del camino de la lista es mejor o igual que el nuevo, no hacemos nada
+        anterior = entrada.get(nodo)
+        if anterior is not None and anterior & MASCARA_G <= g:
+            return
+        # Se calcula la prioridad f del nodo (g y h enteros, como en los buckets) y se empaqueta con el nodo y la g
+        f = g + h
+        clave = (((f << BITS_NODO) | nodo) << BITS_G) | g
+        entrada[nodo] = clave
+        heappush(self.monticulo, clave)
+
+
+    # Funcion que inserta (o mejora) de una vez varios nodos, dados como tuplas (nodo, g, h)
+    def insertar_muchos(self, nodos):
+        insertar = self.insertar
+        for nodo, g, h in nodos:
+            insertar(nodo, g, h)
+
+
+    # Funcion que extrae el nodo con el menor coste f para expandirlo
+    def extraer_minimo(self):
+        # Atributos y funciones usados en el bucle guardados en variables locales
+        monticulo = self.monticulo
+        entrada = self.entrada
+        mascara_nodo = MASCARA_NODO
+        # Se descartan las claves obsoletas hasta encontrar una vigente
+        while monticulo:
+            clave = heappop(monticulo)
+            nodo = (clave >> BITS_G) & mascara_nodo
+            if entrada.get(nodo) == clave:
+                del entrada[nodo]
+                return nodo, clave & MASCARA_G
+        # Si el monticulo está vacio, se devuelve none, ya que no hay nada que devolver
+        return None
+
+    # Funcion que devuelve el menor f de la lista sin extraer el nodo (infinito si esta vacia)
+    def minimo_f(self):
+        monticulo = self.monticulo
+        entrada = self.entrada
+        # Se descartan las claves obsoletas de la cima, igual que en extraer_minimo
+        while monticulo:
+            clave = monticulo[0]
+            if entrada.get((clave >> BITS_G) & MASCARA_NODO) == clave:
+                return clave >> (BITS_G + BITS_NODO)
+            heappop(monticulo)
+        return float('inf')
+
+    # Funcion que verifica si la lista abierta está vacia
+    def esta_vacia(self):
+        return not self.entrada
+
+    # Funcion que verifica si un nodo esta en la lista abierta
+    def contiene(self, nodo):
+        return nodo in self.entrada
+
+    # Funcion que obtiene el valor del coste acumulado g de un nodo en la lista abierta
+    def obtener_g(self, nodo):
+        clave = self.entrada.get(nodo)
+        if clave is not None:
+            return clave & MASCARA_G
+        return None
+
+    # Funcion que devuelve el numero de nodos de la lista abierta
+    def __len__(self):
+        return len(self.entrada)
+
+
+# Clase que implementa la lista abierta con un monticulo (heapq) y borrado perezoso sin ningun indice de posiciones
+# Cada entrada es un entero que empaqueta solo (f, nodo): f en los bits altos y el nodo en los 32 bajos. La g no va en la
+# clave porque el algoritmo ya la tiene en su array de mejores g, que se pasa al crear la lista, y asi las claves son mas
+# cortas y heapq las compara antes. Una entrada es obsoleta si su f ya no es la ultima insertada para su nodo (al mejorar
+# la g de un nodo su f baja). Solo se debe insertar un nodo cuando su g mejora. No hace falta lista cerrada: la h truncada
+# es admisible pero no siempre consistente en mapas reales, y si la g de un nodo ya extraido mejora, se vuelve a insertar
+# y se expande otra vez, que es lo que mantiene optimo el resultado
+class ListaAbiertaPerezosa:
+
+    # Atributos fijos guardados en slots (ver ListaAbierta)
+    __slots__ = ('monticulo', 'g_minimo', 'f_vigente')
+
+    def __init__(self, g_minimo):
+        self.monticulo = [] # Monticulo de claves empaquetadas, incluidas las obsoletas
+        self.g_minimo = g_minimo # Array (del algoritmo) con la mejor g de cada nodo, de tipo entero
+        self.f_vigente = array('q', [-1]) * len(g_minimo) # f de la ultima entrada insertada de cada nodo
+
+
+    # Funcion que inserta un nodo cuya g acaba de mejorar (la entrada anterior, si la hay, queda obsoleta)
+    # A diferencia de las otras listas, recibe la f ya calculada (g + h), porque la g no se guarda en la clave
+    def insertar(self, nodo, f):
+        self.f_vigente[nodo] = f
+        heappush(self.monticulo, (f << BITS_NODO) | nodo)
+
+
+    # Funcion que inserta de una vez varios nodos, dados como tuplas (nodo, f)
+    def insertar_muchos(self, nodos):
+        monticulo = self.monticulo
+        f_vigente = self.f_vigente
+        for nodo, f in nodos:
+            f_vigente[nodo] = f
+            heappush(monticulo, (f << BITS_NODO) | nodo)
+
+
+    # Funcion que extrae el nodo con el menor coste f para expandirlo
+    def extraer_minimo(self):
+        monticulo = self.monticulo
+        f_vigente = self.f_vigente
+        mascara_nodo = MASCARA_NODO
+        # Se descartan las entradas cuya f ya no es la vigente de su nodo
+        while monticulo:
+            clave = heappop(monticulo)
+            nodo = clave & mascara_nodo
+            if f_vigente[nodo] == clave >> BITS_NODO:
+                return nodo, self.g_minimo[nodo]
+        # Si el monticulo está vacio, se devuelve none, ya que no hay nada que devolver
+        return None
+
+    # Funcion que devuelve el menor f de la lista sin extraer el nodo (infinito si esta vacia)
+    def minimo_f(self):
+        monticulo = self.monticulo
+        f_vigente = self.f_vigente
+        while monticulo:
+            clave = monticulo[0]
+            if f_vigente[clave & MASCARA_NODO] == clave >> BITS_NODO:
+                return clave >> BITS_NODO
+            heappop(monticulo)
+        return float('inf')
+
+    # Funcion que verifica si la lista abierta está vacia (puede quedar alguna entrada obsoleta, que extraer_minimo descarta)
+    def esta_vacia(self):
+        return not self.monticulo
+
+    # Funcion que devuelve el numero de entradas del monticulo (incluidas las obsoletas)
+    def __len__(self):
+        return len(self.monticulo)
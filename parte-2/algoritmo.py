@@ -1,120 +1,177 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from abierta import ListaAbierta
+from array import array
+from collections import OrderedDict
 
+from abierta import ListaAbiertaHeap, ListaAbiertaPerezosa
+
+
+# Valor de g de los nodos aun no alcanzados (mayor que el coste de cualquier camino)
+SIN_ALCANZAR = 1 << 62
+
+# Rutas ya resueltas, para no repetir la busqueda si se vuelve a pedir la misma consulta sobre el mismo grafo
+# Clave: (version del grafo, algoritmo, origen, destino), valor: tupla (camino, coste)
+# Se guardan como mucho MAX_RUTAS: al pasarse se quita la ruta usada hace mas tiempo
+MAX_RUTAS = 4096
+_rutas = OrderedDict()
+
+
+# Clase base con la busqueda comun a A* y Dijkstra: los dos algoritmos solo se diferencian en la heuristica,
+# asi que el bucle de resolver esta una sola vez aqui y cada subclase define su heuristica
+class AlgoritmoBusqueda:
 
-# Clase donde se implementa el algoritmo de A* usando una memoria "cache" de h(n)
-class AlgoritmoAEstrella:
-    
     def __init__(self, grafo, origen, destino):
         self.grafo = grafo # Objeto Grafo con el problema.
         self.origen = origen # Identificador del vértice de inicio.
         self.destino = destino # Identificador del vértice de destino.
         self.expansiones = 0 # numero de expansiones (al principio 0)
         self.coste_optimo = None # Será el coste del camino optimo
-        # Se crea diccionario vacio para guardar los valores de la heuristica
-        self.cache_h = {} # Lo hacemos para evitar calcular multiples veces la distiancia Haversine de un mismo nodo 
-        # variables para las estadisticas
-        self.hits_cache = 0  
-        self.miss_cache = 0
-    
+        # Numero de llamadas a la heuristica y de fallos de su cache, para las estadisticas de AlgoritmoAEstrella
+        self.llamadas_heuristica = 0
+        self.fallos_heuristica = 0
+        # True si resolver ha devuelto una ruta guardada sin buscar (y por tanto sin expansiones)
+        self.desde_cache = False
 
-    # Funcion que calcula la distancia Haversine (h(n)) desde el nodo actual, pasado como argumento, al nodo de destino
+
+    # Heuristica por defecto h(n)=0, con la que la busqueda es Dijkstra
     def heuristica(self, nodo):
-        # Se verifica primero si la h(n) ya está en caché
-        if nodo in self.cache_h:
-            self.hits_cache += 1
-            # Se devuelve el valor guardado en el diccionario
-            return self.cache_h[nodo]
-        
-        # Si no está en cache, calculamos la distancia llamando a la funcion distancia_haversine de la clase grafo
-        self.miss_cache += 1 # sumamos uno ya que ha ocurrido un "fallo de caché"
-        h = self.grafo.distancia_haversine(nodo, self.destino)
-        # Se guarda en cache la distancia calculada (para que no se tenga que calcular más)
-        self.cache_h[nodo] = h
-        # Se devuelve la distancia calculada
-        return h
-    
+        return 0
+
+
+    # Funcion que prepara lo que necesite la heuristica antes de la busqueda (la de Dijkstra no necesita nada)
+    # Se llama desde _buscar despues de comprobar si el origen es el destino, para no reservar nada en ese caso
+    def _preparar_heuristica(self):
+        pass
+
 
-    # Funcion que ejecuta el algoritmo A* para encontrar el camino más óptimo
+    # Funcion que devuelve el camino más óptimo y su coste, reutilizando el resultado si ya se resolvio esa consulta
     def resolver(self):
+        # La clave incluye la clase porque con empates cada algoritmo puede devolver un camino optimo distinto
+        clave = (self.grafo.version, type(self).__name__, self.origen, self.destino)
+        resultado = _rutas.get(clave)
+        if resultado is None:
+            camino, coste = self._buscar()
+            resultado = (tuple(camino) if camino is not None else None, coste)
+            _rutas[clave] = resultado
+            if len(_rutas) > MAX_RUTAS:
+                _rutas.popitem(last=False)
+        else:
+            # No se ha buscado nada, asi que las expansiones y las llamadas a la heuristica se quedan a 0
+            _rutas.move_to_end(clave)
+            self.desde_cache = True
+        camino, coste = resultado
+        self.coste_optimo = coste
+        # Se devuelve una copia del camino para que quien lo reciba no pueda modificar el guardado
+        return (list(camino) if camino is not None else None), coste
+
+
+    # Funcion que ejecuta la busqueda (A* o Dijkstra segun la heuristica) para encontrar el camino más óptimo
+    def _buscar(self):
+
+        # Si el origen es el destino, el camino es solo el origen: se devuelve sin reservar los arrays de la busqueda
+        if self.origen == self.destino:
+            self.coste_optimo = 0
+            return [(self.origen, 0)], 0
+
+        self._preparar_heuristica()
 
-        # abierta es una instancia de la clase lista abierta.
-        abierta = ListaAbierta()
-        # Diccionario donde se guarda cada nodo con su mejor g(n) hasta el momento
-        g_minimo = {self.origen: 0} # llegar al origen cuesta 0
-        # Diccionario para reconstruir el camino, guarda qué padres tiene cada nodo
-        padres = {self.origen: (None, 0)}
-        # Diccionario que almacena el conjunto de nodos ya expandidos
-        cerrada = set()
+        # El estado de la busqueda se guarda en arrays indexados por el id del nodo (enteros densos 1..n como en DIMACS)
+        # en vez de en diccionarios, para no calcular hashes ni crear tuplas en el bucle interno
+        num_nodos = self.grafo.num_vertices + 1
+        # Array donde se guarda cada nodo con su mejor g(n) hasta el momento (SIN_ALCANZAR si aun no se ha alcanzado)
+        # Es de enteros porque la lista abierta devuelve la g de aqui y la g forma parte de las claves empaquetadas
+        g_minimo = array('q', [SIN_ALCANZAR]) * num_nodos
+        g_minimo[self.origen] = 0 # llegar al origen cuesta 0
+        # Arrays para reconstruir el camino: padre de cada nodo (-1 si no tiene) y coste del arco desde el padre
+        padres = array('i', [-1]) * num_nodos
+        costes_arco = array('i', [0]) * num_nodos
+        # abierta es una instancia de la clase lista abierta, que descarta por si sola las entradas obsoletas y saca la g de g_minimo
+        # Como un nodo solo se vuelve a insertar si mejora su g, no hace falta lista cerrada: si la g de un nodo ya
+        # expandido mejora (la h puede no ser consistente), se reexpande y el camino sigue siendo optimo
+        abierta = ListaAbiertaPerezosa(g_minimo)
         
+        # La heuristica se guarda en una variable local para no buscar el metodo en cada sucesor
+        heuristica = self.heuristica
         # Se calcula la heuristica del nodo inicial respecto al nodo final
-        h_origen = self.heuristica(self.origen)
-        # Se inserta el nodo inicial en la lista abierta
-        abierta.insertar(self.origen, 0, h_origen)
+        h_origen = heuristica(self.origen)
+        llamadas_h = 1 # llamadas a la heuristica (se cuentan por expansion y no dentro de heuristica)
+        # Se inserta el nodo inicial en la lista abierta (su g es 0, asi que su f es h)
+        abierta.insertar(self.origen, h_origen)
+        
+        # Atributos y metodos usados en el bucle guardados en variables locales, para no buscarlos en cada iteracion
+        destino = self.destino
+        obtener_sucesores = self.grafo.obtener_sucesores
+        extraer_minimo = abierta.extraer_minimo
+        insertar_muchos = abierta.insertar_muchos
+        expansiones = 0
         
         # Bucle que se repite hasta que la lista abierta quede vacia
         while not abierta.esta_vacia():
             # Extraer nodo con menor f(n) de la lista abierta llamando a extraer_minimo
-            resultado = abierta.extraer_minimo()
-            # Si no hay minimo, algo ha fallado, no debería pasar
+            resultado = extraer_minimo()
+            # Si no hay minimo, solo quedaban entradas obsoletas
             if resultado is None:
                 break
             # Obtenemos los datos de la tupla del resultado (nodo y g)
             nodo_actual, g_actual = resultado
             
             # Si el nodo actual es el de destino, ya hemos terminado
-            if nodo_actual == self.destino:
+            if nodo_actual == destino:
                 self.coste_optimo = g_actual # Coste optimo pasa a ser el g del resultado
+                self.expansiones = expansiones
+                self.llamadas_heuristica = llamadas_h
                 # Se llama a la funcion reconstruir camino para obtener el camino funal
-                camino = self._reconstruir_camino(padres, nodo_actual)
+                camino = self._reconstruir_camino(padres, costes_arco, nodo_actual)
                 # Se devuelve tanto el camino final como el coste acumulado del camino
                 return camino, g_actual
             
             # Si no hemos llegado al nodo de destino todavía, expandimos
-            self.expansiones += 1
-            # Metemos al nodo actual en la lista de nodos ya visitados
-            cerrada.add(nodo_actual)
+            expansiones += 1
             
+            # Sucesores mejorados, que se insertan juntos en la lista abierta al acabar la expansion
+            mejorados = []
             # Expandimos para cada sucesor del nodo actual
-            for sucesor, coste_arco in self.grafo.obtener_sucesores(nodo_actual):
-                # Si el sucesor está en la lista cerrada ya, no se visita de nuevo
-                if sucesor in cerrada:
-                    continue
-                
+            for sucesor, coste_arco in obtener_sucesores(nodo_actual):
                 # Se calcula el nuevo g sumándole el coste del arco
                 g_sucesor = g_actual + coste_arco
                 
                 # Si encontramos un mejor camino
-                if g_sucesor < g_minimo.get(sucesor, float('inf')):
+                if g_sucesor < g_minimo[sucesor]:
                     # Actualizamos el coste
                     g_minimo[sucesor] = g_sucesor
                     # Guardamos en la lista de padres que venimos del nodo actual para ir al sucesor
-                    padres[sucesor] = (nodo_actual, coste_arco)
+                    padres[sucesor] = nodo_actual
+                    costes_arco[sucesor] = coste_arco
                     
                     # Se obtiene la heuristica del sucesor llamando a la funcion heuristica
-                    h_sucesor = self.heuristica(sucesor)
-                    # Insertamos (o actualizamos) el sucesor en la lista abierta con su nuevo coste y heuristica
-                    abierta.insertar(sucesor, g_sucesor, h_sucesor)
+                    h_sucesor = heuristica(sucesor)
+                    # Se apunta el sucesor para insertarlo (o actualizarlo) con su nuevo f = g + h
+                    mejorados.append((sucesor, g_sucesor + h_sucesor))
+            
+            # Insertamos (o actualizamos) de una vez los sucesores mejorados en la lista abierta
+            insertar_muchos(mejorados)
+            llamadas_h += len(mejorados)
         
         # No se encontró solución
+        self.expansiones = expansiones
+        self.llamadas_heuristica = llamadas_h
         return None, None
     
 
     # Funcion que reconstruye el camino desde el origen hasta el objetivo
-    def _reconstruir_camino(self, padres, nodo_objetivo):
+    def _reconstruir_camino(self, padres, costes_arco, nodo_objetivo):
 
         camino = [] # lista que se devolvera y contendrá los nodos ordenados
         nodo_actual = nodo_objetivo # Se empieza por el final
         
         # Bucle while que va retrocediendo hasta el inicio
-        # El nodo inicial se habrá guardado con padre = none, lo que detendrá el bucle
-        while nodo_actual is not None:
+        # El nodo inicial no tiene padre (-1), lo que detendrá el bucle
+        while nodo_actual != -1:
             # Se recupera el padre y el costo_arco del nodo actual
-            padre, coste_arco = padres[nodo_actual]
+            padre = padres[nodo_actual]
             # Se añade al camino la tupla nodo, coste
-            camino.append((nodo_actual, coste_arco))
+            camino.append((nodo_actual, costes_arco[nodo_actual]))
             # Nodo actual pasa a ser el padre del nodo actual
             nodo_actual = padre
         
@@ -124,15 +181,60 @@ class AlgoritmoAEstrella:
         return camino
     
 
+
+# Clase donde se implementa el algoritmo de A* usando una memoria "cache" de h(n)
+class AlgoritmoAEstrella(AlgoritmoBusqueda):
+    
+    def __init__(self, grafo, origen, destino):
+        super().__init__(grafo, origen, destino)
+        # Array indexado por el id del nodo con los valores de la heuristica, se crea en _preparar_heuristica
+        self.cache_h = None
+        # Funcion que calcula la distancia Haversine hasta el destino, se crea en _preparar_heuristica
+        self.distancia_destino = None
+
+
+    # Funcion que crea la cache de h(n) y la funcion de distancia al destino justo antes de la busqueda
+    def _preparar_heuristica(self):
+        # Se crea un array indexado por el id del nodo para guardar los valores de la heuristica (-1 = aun no calculada)
+        self.cache_h = array('q', [-1]) * (self.grafo.num_vertices + 1) # Lo hacemos para evitar calcular multiples veces la distiancia Haversine de un mismo nodo 
+        # Funcion que calcula la distancia Haversine hasta el destino (con los terminos del destino ya precalculados)
+        self.distancia_destino = self.grafo.distancia_haversine_a(self.destino)
+    
+
+    # Funcion que calcula la distancia Haversine (h(n)) desde el nodo actual, pasado como argumento, al nodo de destino
+    def heuristica(self, nodo):
+        # Si se llama antes de resolver, la cache aun no existe y se crea ahora
+        if self.cache_h is None:
+            self._preparar_heuristica()
+        # Se verifica primero si la h(n) ya está en caché
+        h = self.cache_h[nodo]
+        if h >= 0:
+            # Se devuelve el valor guardado en el array
+            return h
+        
+        # Si no está en cache, se cuenta el fallo y calculamos la distancia con la funcion obtenida de distancia_haversine_a
+        # de la clase grafo. Se trunca a entero una sola vez: sigue siendo admisible (es menor o igual) y la lista abierta
+        # trabaja con f enteras. Con costes enteros truncar no rompe la consistencia, pero en mapas reales un arco puede
+        # costar menos que la distancia Haversine entre sus extremos, asi que h no siempre es consistente
+        self.fallos_heuristica += 1
+        h = int(self.distancia_destino(nodo))
+        # Se guarda en cache la distancia calculada (para que no se tenga que calcular más)
+        self.cache_h[nodo] = h
+        # Se devuelve la distancia calculada
+        return h
+    
+
     # Funcion que obtiene estadisticas del uso del diccionario cache
     def obtener_estadisticas_cache(self):
 
-        total = self.hits_cache + self.miss_cache
-        ratio = self.hits_cache / total if total > 0 else 0
+        miss_cache = self.fallos_heuristica
+        total = self.llamadas_heuristica
+        hits_cache = total - miss_cache
+        ratio = hits_cache / total if total > 0 else 0
         
         return {
-            'hits': self.hits_cache, # Numero de aciertos
-            'misses': self.miss_cache, # Numero de fallos
+            'hits': hits_cache, # Numero de aciertos
+            'misses': miss_cache, # Numero de fallos
             'total': total, # Numero de aciertos + numero de fallos 
             'hit_ratio': ratio, # hit ratio
             'ahorro_calculos': f"{ratio*100:.1f}%" # porcentaje de ahorro al implementar la "cache"
@@ -140,96 +242,206 @@ class AlgoritmoAEstrella:
 
 
 
-# Implementacion del algoritmo de Dijktra
-class AlgoritmoDijkstra:
+# Clase donde se implementa A* con la heuristica ALT (A*, landmarks y desigualdad triangular): con las distancias
+# precalculadas desde y hasta cada landmark L, d(L,t) - d(L,n) y d(n,L) - d(t,L) son cotas inferiores de d(n,t)
+# Se usa la mayor de esas cotas y de la distancia Haversine, que sigue siendo admisible (y consistente cuando lo es la
+# distancia Haversine) y poda mas nodos
+# Los landmarks se calculan una vez por grafo (la primera vez que se pide), asi que compensa cuando hay muchas consultas
+class AlgoritmoAEstrellaALT(AlgoritmoAEstrella):
+
+    def __init__(self, grafo, origen, destino):
+        super().__init__(grafo, origen, destino)
+        self.terminos = None # Terminos de cada landmark, se calculan en _preparar_heuristica
+
+
+    # Funcion que ademas de la cache de h(n) calcula los landmarks (si el grafo aun no los tiene) y sus terminos
+    def _preparar_heuristica(self):
+        super()._preparar_heuristica()
+        grafo = self.grafo
+        destino = self.destino
+        if grafo.landmarks is None:
+            grafo.precalcular_landmarks()
+        # Para cada landmark se guardan sus arrays de distancias y las distancias del destino, que no cambian en la busqueda
+        # Si el destino no se alcanza desde un landmark (o no lo alcanza), ese sentido no da cota y se marca con None
+        self.terminos = []
+        for _, desde, hasta in grafo.landmarks:
+            desde_destino = desde[destino] if desde[destino] >= 0 else None
+            hasta_destino = hasta[destino] if hasta[destino] >= 0 else None
+            self.terminos.append((desde, hasta, desde_destino, hasta_destino))
+
+
+    # Funcion que calcula h(n) como la mayor de las cotas de los landmarks y de la distancia Haversine
+    def heuristica(self, nodo):
+        # Si se llama antes de resolver, la cache, los landmarks y sus terminos se preparan ahora
+        if self.cache_h is None:
+            self._preparar_heuristica()
+        h = self.cache_h[nodo]
+        if h >= 0:
+            return h
+
+        self.fallos_heuristica += 1
+        h = int(self.distancia_destino(nodo))
+        for desde, hasta, desde_destino, hasta_destino in self.terminos:
+            # d(n,t) >= d(L,t) - d(L,n), si L alcanza a n y a t
+            if desde_destino is not None and desde[nodo] >= 0 and desde_destino - desde[nodo] > h:
+                h = desde_destino - desde[nodo]
+            # d(n,t) >= d(n,L) - d(t,L), si n y t alcanzan a L
+            if hasta_destino is not None and hasta[nodo] - hasta_destino > h:
+                h = hasta[nodo] - hasta_destino
+        self.cache_h[nodo] = h
+        return h
+
+
+# Clase donde se implementa A* bidireccional: una busqueda desde el origen sobre los arcos del grafo y otra
+# desde el destino sobre los arcos invertidos, que se detienen cuando ya no pueden mejorar el mejor camino
+# que pasa por un nodo alcanzado por las dos. Cada una solo tiene que cubrir parte del camino, por lo que
+# se expanden menos nodos que con una sola busqueda
+class AlgoritmoAEstrellaBidireccional:
+
     def __init__(self, grafo, origen, destino):
-        
         self.grafo = grafo # Objeto Grafo con el problema.
         self.origen = origen # Identificador del vértice de inicio.
-        self.destino = destino # Identificador del vértice objetivo.
-        self.expansiones = 0 # numero de expansiones (al principio 0)
-        self.coste_optimo = None # Será el coste acumulado del camino optimo
-    
+        self.destino = destino # Identificador del vértice de destino.
+        self.expansiones = 0 # numero de expansiones de las dos busquedas (al principio 0)
+        self.coste_optimo = None # Será el coste del camino optimo
+        # La cache de potenciales, las funciones de distancia y el desplazamiento se crean en _preparar_potencial,
+        # que resolver llama despues de comprobar si el origen es el destino
+        self.cache_p = None
+        self.distancia_destino = None
+        self.distancia_origen = None
+        self.desplazamiento = 0
+
+
+    # Funcion que calcula el potencial de un nodo: h hasta el destino - h hasta el origen + desplazamiento
+    # Es el doble de la media de las dos heuristicas (asi es entero), que es consistente en los dos sentidos a la vez
+    # cuando lo son las dos: la busqueda hacia delante usa p(n) y la de hacia atras 2*desplazamiento - p(n)
+    def potencial(self, nodo):
+        # Si se llama antes de resolver, la cache aun no existe y se crea ahora
+        if self.cache_p is None:
+            self._preparar_potencial()
+        p = self.cache_p[nodo]
+        if p < 0:
+            # Cada distancia se trunca a entero como en AlgoritmoAEstrella (con costes enteros no rompe la consistencia)
+            p = int(self.distancia_destino(nodo)) - int(self.distancia_origen(nodo)) + self.desplazamiento
+            self.cache_p[nodo] = p
+        return p
+
+
+    # Funcion que crea la cache de potenciales, las funciones de distancia y el desplazamiento justo antes de la busqueda
+    def _preparar_potencial(self):
+        # Array indexado por el id del nodo con el potencial de cada nodo (-1 = aun no calculado)
+        self.cache_p = array('q', [-1]) * (self.grafo.num_vertices + 1)
+        # Funciones que calculan la distancia Haversine hasta el destino y hasta el origen
+        self.distancia_destino = self.grafo.distancia_haversine_a(self.destino)
+        self.distancia_origen = self.grafo.distancia_haversine_a(self.origen)
+        # Desplazamiento que hace que el potencial nunca sea negativo (la diferencia de las dos distancias no
+        # puede ser menor que menos la distancia entre origen y destino, mas 2 por los truncamientos)
+        self.desplazamiento = int(self.distancia_origen(self.destino)) + 2
+
 
-    # Funcion que ejecuta el algoritmo de dijkstra
+    # Funcion que ejecuta las dos busquedas alternandolas hasta que ya no se pueda mejorar el mejor camino encontrado
     def resolver(self):
-        # abierta es una instancia de la clase lista abierta.
-        abierta = ListaAbierta()
-        # Diccionario donde se guarda cada nodo con su mejor g(n) hasta el momento
-        g_minimo = {self.origen: 0} # llegar al origen cuesta 0
-        # Diccionario para reconstruir el camino, guarda qué padres tiene cada nodo
-        padres = {self.origen: (None, 0)}
-        # Diccionario que almacena el conjunto de nodos ya expandidos
-        cerrada = set()
-        
-        # h=0 para Dijkstra, puesto que no se utilizan heuristicas
-        # Se inserta el nodo inicial en la lista abierta
-        abierta.insertar(self.origen, 0, 0)
-        
-        # Bucle que se repite hasta que la lista abierta quede vacia
-        while not abierta.esta_vacia():
-            # Extraer nodo con menor f(n) de la lista abierta llamando a extraer_minimo
-            resultado = abierta.extraer_minimo()
-            # Si no hay minimo, algo ha fallado, no debería pasar
-            if resultado is None:
+
+        origen = self.origen
+        destino = self.destino
+        # Si el origen es el destino, el camino es solo el origen
+        if origen == destino:
+            self.coste_optimo = 0
+            return [(origen, 0)], 0
+
+        self._preparar_potencial()
+        num_nodos = self.grafo.num_vertices + 1
+        infinito = float('inf')
+        potencial = self.potencial
+        doble_desplazamiento = 2 * self.desplazamiento
+        # Estado de la busqueda hacia delante (igual que en AlgoritmoAEstrella)
+        abierta_adelante = ListaAbiertaHeap()
+        g_adelante = array('d', [infinito]) * num_nodos
+        padres = array('i', [-1]) * num_nodos # nodo anterior en el camino desde el origen
+        costes_padre = array('i', [0]) * num_nodos
+        # Estado de la busqueda hacia atras: para cada nodo se guarda el siguiente nodo en el camino hasta el destino
+        abierta_atras = ListaAbiertaHeap()
+        g_atras = array('d', [infinito]) * num_nodos
+        siguientes = array('i', [-1]) * num_nodos
+        costes_siguiente = array('i', [0]) * num_nodos
+        # No hace falta lista cerrada en ningun sentido: donde el potencial es consistente, un nodo ya expandido no puede
+        # mejorar su g y la comprobacion g_vecino < g_propio[vecino] ya lo descarta. Donde no lo es, un nodo cuya g mejora
+        # se vuelve a insertar y se expande otra vez, igual que en AlgoritmoAEstrella
+
+        # La prioridad de cada nodo en las listas es 2*g + potencial (se pasa como h = g + potencial)
+        g_adelante[origen] = 0
+        g_atras[destino] = 0
+        abierta_adelante.insertar(origen, 0, potencial(origen))
+        abierta_atras.insertar(destino, 0, doble_desplazamiento - potencial(destino))
+
+        mejor_coste = infinito # coste del mejor camino completo encontrado hasta ahora
+        encuentro = -1 # nodo donde se unen las dos busquedas en ese camino
+
+        # Bucle que se repite mientras las dos listas abiertas tengan nodos
+        while not abierta_adelante.esta_vacia() and not abierta_atras.esta_vacia():
+            # La suma de las dos prioridades minimas es una cota inferior (del doble, mas los desplazamientos) de
+            # cualquier camino que aun no se haya encontrado, asi que si ya no es menor, el mejor camino es el optimo
+            if abierta_adelante.minimo_f() + abierta_atras.minimo_f() >= 2 * mejor_coste + doble_desplazamiento:
                 break
-            # Obtenemos los datos de la tupla del resultado (nodo y g)
-            nodo_actual, g_actual = resultado
-            
-            # Si el nodo actual es el de destino, ya hemos terminado
-            if nodo_actual == self.destino:
-                self.coste_optimo = g_actual # Coste optimo pasa a ser el g del resultado
-                # Se llama a la funcion reconstruir camino para obtener el camino final
-                camino = self._reconstruir_camino(padres, nodo_actual)
-                # Se devuelve tanto el camino final como el coste acumulado del camino
-                return camino, g_actual
-            
-            # Si no hemos llegado al nodo de destino todavía, expandimos
+
+            # Se expande por el sentido con la lista abierta mas pequeña, para que las dos busquedas avancen parejas
+            if len(abierta_adelante) <= len(abierta_atras):
+                abierta, g_propio, g_otro = abierta_adelante, g_adelante, g_atras
+                enlaces, costes_enlace = padres, costes_padre
+                vecinos = self.grafo.obtener_sucesores
+                signo, base = 1, 0
+            else:
+                abierta, g_propio, g_otro = abierta_atras, g_atras, g_adelante
+                enlaces, costes_enlace = siguientes, costes_siguiente
+                vecinos = self.grafo.obtener_predecesores
+                signo, base = -1, doble_desplazamiento
+
+            nodo_actual, g_actual = abierta.extraer_minimo()
             self.expansiones += 1
-            # Metemos al nodo actual en la lista de nodos ya visitados
-            cerrada.add(nodo_actual)
-            
-            # Expandimos para cada sucesor del nodo actual
-            for sucesor, coste_arco in self.grafo.obtener_sucesores(nodo_actual):
-                # Si el sucesor está en la lista cerrada ya, no se visita de nuevo
-                if sucesor in cerrada:
-                    continue
-                
-                # Se calcula el nuevo g sumándole el coste del arco
-                g_sucesor = g_actual + coste_arco
-                
-                # Si encontramos un mejor camino
-                if g_sucesor < g_minimo.get(sucesor, float('inf')):
-                    # Actualizamos el coste
-                    g_minimo[sucesor] = g_sucesor
-                    # Guardamos en la lista de padres que venimos del nodo actual para ir al sucesor
-                    padres[sucesor] = (nodo_actual, coste_arco)
-                    # Insertamos (o actualizamos) el sucesor en la lista abierta con su nuevo coste y heuristica
-                    abierta.insertar(sucesor, g_sucesor, 0)
-        
-        # Si hemos llegado hasta aquí, no se encontró solucion
-        return None, None
-    
 
-    # Funcion que reconstruye el camino desde el origen hasta el objetivo
-    def _reconstruir_camino(self, padres, nodo_objetivo):
+            # Vecinos mejorados, que se insertan juntos en la lista abierta al acabar la expansion
+            mejorados = []
+            for vecino, coste_arco in vecinos(nodo_actual):
+                g_vecino = g_actual + coste_arco
+                if g_vecino < g_propio[vecino]:
+                    g_propio[vecino] = g_vecino
+                    enlaces[vecino] = nodo_actual
+                    costes_enlace[vecino] = coste_arco
+                    mejorados.append((vecino, g_vecino, g_vecino + base + signo * potencial(vecino)))
+                    # Si la otra busqueda ya ha llegado al vecino, se tiene un camino completo que pasa por él
+                    if g_vecino + g_otro[vecino] < mejor_coste:
+                        mejor_coste = g_vecino + g_otro[vecino]
+                        encuentro = vecino
 
-        camino = [] # lista que se devolvera y contendrá los nodos ordenados
-        nodo_actual = nodo_objetivo # Se empieza por el final
-        
-        # Bucle while que va retrocediendo hasta el inicio
-        # El nodo inicial se habrá guardado con padre = none, lo que detendrá el bucle
-        while nodo_actual is not None:
-            # Se recupera el padre y el costo_arco del nodo actual
-            padre, coste_arco = padres[nodo_actual]
-            # Se añade al camino la tupla nodo, coste
-            camino.append((nodo_actual, coste_arco))
-            # Nodo actual pasa a ser el padre del nodo actual
-            nodo_actual = padre
-        
-        # Invertir para obtener el camino desde el principio
+            abierta.insertar_muchos(mejorados)
+
+        # Si las busquedas nunca se han encontrado, no hay solucion
+        if encuentro == -1:
+            return None, None
+
+        self.coste_optimo = int(mejor_coste)
+        return self._reconstruir_camino(padres, costes_padre, siguientes, costes_siguiente, encuentro), self.coste_optimo
+
+
+    # Funcion que reconstruye el camino uniendo la parte del origen al nodo de encuentro y la del encuentro al destino
+    def _reconstruir_camino(self, padres, costes_padre, siguientes, costes_siguiente, encuentro):
+
+        # Primera mitad: se retrocede desde el encuentro hasta el origen y se invierte
+        camino = []
+        nodo_actual = encuentro
+        while nodo_actual != -1:
+            camino.append((nodo_actual, costes_padre[nodo_actual]))
+            nodo_actual = padres[nodo_actual]
         camino.reverse()
-        # Se retorna la lista con todas las tuplas ordenadas
+
+        # Segunda mitad: se avanza desde el encuentro hasta el destino siguiendo los enlaces de la busqueda hacia atras
+        nodo_actual = encuentro
+        while siguientes[nodo_actual] != -1:
+            camino.append((siguientes[nodo_actual], costes_siguiente[nodo_actual]))
+            nodo_actual = siguientes[nodo_actual]
         return camino
 
 
+# Implementacion del algoritmo de Dijktra: es la busqueda de AlgoritmoBusqueda con la heuristica por defecto, h=0
+class AlgoritmoDijkstra(AlgoritmoBusqueda):
+    pass
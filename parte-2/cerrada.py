@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from array import array
+
 # Clase donde se implementa una lista cerrada, necesaria po¡ara los algoritmos de A* y Diskstra
 # Se utiliza un diccionario hash en vez de una lista, lo que hace la lista cerrada mucho más eficiente
+# El diccionario solo guarda la posicion de cada nodo; su padre, coste_arco y g van en tres arrays en esa posicion,
+# asi no se crea una tupla (con sus tres enteros) por cada nodo cerrado
 class ListaCerrada:
     
     def __init__(self):
-        self.cerrados = {} # Diccionario donde se almacenaran los nodos que ya han sido visitados
+        self.cerrados = {} # Diccionario donde se almacenaran los nodos que ya han sido visitados (valor: su posicion en los arrays)
+        self.padres = array('q') # Padre de cada nodo cerrado (-1 para el inicial, que no tiene)
+        self.costes_arco = array('q') # Coste del arco desde el padre
+        self.g = array('q') # Coste acumulado desde el inicio
     
     # Funcion que inserta el nodo en la lista cerrados
     def insertar(self, nodo, padre, coste_arco, g):
@@ -15,8 +22,18 @@ class ListaCerrada:
         # coste_arco: Coste del arco desde el padre hasta este nodo.
         # g: Coste acumulado desde el inicio hasta este nodo.
         
-        # Se asigna la entrada en el diccionario (el nodo será la clave y el valor una tupla de padre, coste_arco y g)
-        self.cerrados[nodo] = (padre, coste_arco, g)
+        padre = -1 if padre is None else padre
+        posicion = self.cerrados.get(nodo)
+        # Si el nodo ya estaba, se sobrescriben sus valores; si no, se añaden al final de los arrays
+        if posicion is None:
+            self.cerrados[nodo] = len(self.g)
+            self.padres.append(padre)
+            self.costes_arco.append(coste_arco)
+            self.g.append(g)
+        else:
+            self.padres[posicion] = padre
+            self.costes_arco[posicion] = coste_arco
+            self.g[posicion] = g
     
 
     # Funcion que verifica si el nodo que se pasa como argumento está en la lista cerrada
@@ -24,40 +41,89 @@ class ListaCerrada:
         return nodo in self.cerrados
     
 
-    # Funcion que obtiene el padre (almacenado en las tuplas) del nodo pasado como argumento
+    # Funcion que obtiene el padre del nodo pasado como argumento
     def obtener_padre(self, nodo):
-        # Verifica que el nodo esté en la lista cerrados
-        if nodo in self.cerrados:
-            # Obtiene el padre del nodo ignorando los demás valores de la tupla
-            padre, _, _ = self.cerrados[nodo]
-            return padre
-        # Si el nodo no está en la lista. no retorna nada
-        return None
+        posicion = self.cerrados.get(nodo)
+        # Si el nodo no está en la lista o es el inicial, no retorna nada
+        if posicion is None or self.padres[posicion] == -1:
+            return None
+        return self.padres[posicion]
     
 
-    # Funcion que obtiene el coste_arco (almacenado en las tuplas) del nodo pasado como argumento
+    # Funcion que obtiene el coste_arco del nodo pasado como argumento
     def obtener_coste_arco(self, nodo):
-        # Verifica que el nodo esté en la lista cerrados
-        if nodo in self.cerrados:
-            # Obtiene el coste_arco del nodo ignorando los demás valores de la tupla
-            _, coste_arco, _ = self.cerrados[nodo]
-            return coste_arco
+        posicion = self.cerrados.get(nodo)
         # Si el nodo no está en la lista. retorna un 0
-        return 0
+        if posicion is None:
+            return 0
+        return self.costes_arco[posicion]
     
 
-    # Funcion que obtiene el g (almacenado en las tuplas) del nodo pasado como argumento
+    # Funcion que obtiene el g del nodo pasado como argumento
     def obtener_g(self, nodo):
-        # Verifica que el nodo esté en la lista cerrados
-        if nodo in self.cerrados:
-            # Obtiene el g del nodo ignorando los demás valores de la tupla
-            _, _, g = self.cerrados[nodo]
-            return g
+        posicion = self.cerrados.get(nodo)
         # Si el nodo no está en la lista. no retorna nada
-        return None
+        if posicion is None:
+            return None
+        return self.g[posicion]
 
     
     # Devuelve el número de nodos en la lista cerrada.
     def __len__(self):
         return len(self.cerrados)
+
+
+# Version de la lista cerrada para grafos con ids de nodo densos (1..n como en DIMACS), con la misma interfaz que ListaCerrada
+# En vez de un diccionario de posiciones usa directamente el id del nodo como indice de los arrays, asi insertar no toca ningun diccionario
+# y cada consulta es una lectura de array sin calcular hashes. Para ids dispersos se sigue usando ListaCerrada
+class ListaCerradaIndexada:
+
+    # Atributos fijos guardados en slots, para no crear un diccionario por instancia
+    __slots__ = ('padres', 'costes_arco', 'g', 'visitado', 'num_cerrados')
+
+    def __init__(self, num_nodos):
+        self.padres = array('i', [-1]) * num_nodos # Padre de cada nodo (-1 si no tiene, en vez de None)
+        self.costes_arco = array('i', [0]) * num_nodos # Coste del arco desde el padre
+        self.g = array('q', [0]) * num_nodos # Coste acumulado desde el inicio
+        self.visitado = bytearray(num_nodos) # 1 si el nodo esta en la lista
+        self.num_cerrados = 0 # Numero de nodos en la lista
+    
+    # Funcion que inserta el nodo en la lista (mismos argumentos que ListaCerrada.insertar)
+    def insertar(self, nodo, padre, coste_arco, g):
+        if not self.visitado[nodo]:
+            self.visitado[nodo] = 1
+            self.num_cerrados += 1
+        self.padres[nodo] = -1 if padre is None else padre
+        self.costes_arco[nodo] = coste_arco
+        self.g[nodo] = g
+    
+
+    # Funcion que verifica si el nodo que se pasa como argumento está en la lista cerrada
+    def contiene(self, nodo):
+        return self.visitado[nodo] == 1
     
+
+    # Funcion que obtiene el padre del nodo pasado como argumento (None si no esta o si es el inicial)
+    def obtener_padre(self, nodo):
+        if self.visitado[nodo] and self.padres[nodo] != -1:
+            return self.padres[nodo]
+        return None
+    
+
+    # Funcion que obtiene el coste_arco del nodo pasado como argumento (0 si no esta)
+    def obtener_coste_arco(self, nodo):
+        if self.visitado[nodo]:
+            return self.costes_arco[nodo]
+        return 0
+    
+
+    # Funcion que obtiene el g del nodo pasado como argumento (None si no esta)
+    def obtener_g(self, nodo):
+        if self.visitado[nodo]:
+            return self.g[nodo]
+        return None
+
+    
+    # Devuelve el número de nodos en la lista cerrada.
+    def __len__(self):
+        return self.num_cerrados
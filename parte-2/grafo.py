@@ -2,6 +2,14 @@
 # -*- coding: utf-8 -*-
 
 import math
+from array import array
+from heapq import heappush, heappop
+from itertools import chain, count
+from operator import itemgetter
+
+
+# Contador global de versiones de grafo: cada grafo (y cada carga de un fichero) recibe un numero distinto
+_versiones = count(1)
 
 
 # Esta clase modela un grafo dirigido y ponderado donde los nodos tienen coordenadas geográficas (latitud/longitud).
@@ -9,6 +17,9 @@ class Grafo:
     
     # Radio de la Tierra en metros para el cálculo de distancias geodésicas
     RADIO_TIERRA = 6371000
+
+    # Atributos fijos: se guardan en slots en vez de en un diccionario por instancia, lo que tambien agiliza su acceso
+    __slots__ = ('num_vertices', 'num_arcos', 'adyacencia', 'coordenadas', 'predecesores', 'landmarks', 'version')
     
     def __init__(self):
         self.num_vertices = 0 # Número de vértices en el grafo (inicialmente son 0)
@@ -17,16 +28,27 @@ class Grafo:
         self.adyacencia = {} # Clave: id del nodo origen, valor: lista de tuplas (destino,coste)
         # Diccionario para guardar la ubicacion fisica de los nodos
         self.coordenadas = {} # Clave: id del nodo origen, valor: lista de tuplas (latitud, longitud)
+        # Lista de adyacencia inversa, solo la usa la busqueda bidireccional y se construye la primera vez que se pide
+        self.predecesores = None # Clave: id del nodo destino, valor: lista de tuplas (origen, coste)
+        # Landmarks para la heuristica ALT, solo se calculan si se piden con precalcular_landmarks
+        self.landmarks = None # Lista de tuplas (landmark, distancias desde el landmark, distancias hasta el landmark)
+        # Numero de version del grafo, que cambia en cada carga: las rutas guardadas por los algoritmos lo usan en su clave
+        # para no devolver una ruta de un grafo distinto o ya modificado
+        self.version = next(_versiones)
     
 
     # carga la estructura del grafo desde un fichero .gr de DIMACS (que recibe como argumento)
     def cargar_grafo(self, fichero_gr):
+        # Al cambiar los arcos dejan de valer la adyacencia inversa, los landmarks y las rutas guardadas (nueva version)
+        self.predecesores = None
+        self.landmarks = None
+        self.version = next(_versiones)
         # Abre el archivo pasado como argumento en forma de solo lectura (se le pone un alias f)
         with open(fichero_gr, 'r') as f:
             # bucle que se repite para cada linea del fichero
             for linea in f:
-                # Se limpian los espacios y se divide la linea en palabras
-                partes = linea.strip().split()
+                # Se divide la linea en palabras (split() ya ignora los espacios y el salto de linea de los extremos)
+                partes = linea.split()
                 # Comprueba que el numero de palabras de la linea sea mayor que cuatro y que empieze por a, si no es así, se ignora
                 # esto es así porque DIMACS usa lineas que empiezan por 'a' para definir las conexiones
                 if len(partes) >= 4 and partes[0] == 'a':
@@ -46,20 +68,23 @@ class Grafo:
 
     # Carga las coordenadas geográficas desde un fichero .co de DIMACS (pasado como argumento)
     def cargar_coordenadas(self, fichero_co):
+        # Al cambiar las coordenadas cambia la heuristica, asi que las rutas guardadas dejan de valer (nueva version)
+        self.version = next(_versiones)
         # Abre el archivo pasado como argumento en forma de solo lectura (se le pone un alias f)
         with open(fichero_co, 'r') as f:
-            # Se limpian los espacios y se divide la linea en palabras
+            # Se divide cada linea en palabras (split() ya ignora los espacios y el salto de linea de los extremos)
             for linea in f:
                 # Comprueba que el numero de palabras de la linea sea mayor que cuatro y que empieze por w
-                partes = linea.strip().split()
+                partes = linea.split()
                 if len(partes) >= 4 and partes[0] == 'v':
                     # Se parsean las palabras leidas de la linea
                     vertice = int(partes[1])
                     # Las coordenadas vienen multiplicadas por 1e6, por lo tanto, se dividen por ese numero
-                    longitud = int(partes[2]) / 1e6
-                    latitud = int(partes[3]) / 1e6
+                    # Se pasan ya a radianes, que es como las usa la formula de Haversine, para no convertirlas en cada llamada
+                    longitud = math.radians(int(partes[2]) / 1e6)
+                    latitud = math.radians(int(partes[3]) / 1e6)
                     
-                    # Se guarda la posicion del vertice en la lista de coordenadas
+                    # Se guarda la posicion del vertice (en radianes) en la lista de coordenadas
                     self.coordenadas[vertice] = (latitud, longitud)
                     self.num_vertices += 1
     
@@ -69,6 +94,25 @@ class Grafo:
     def cargar(self, nombre_base):
         self.cargar_grafo(nombre_base + '.gr')
         self.cargar_coordenadas(nombre_base + '.co')
+        self.comprobar_ids()
+    
+
+    # Funcion que comprueba que los ids de los vertices son los enteros 1..num_vertices, como en DIMACS
+    # Los algoritmos guardan su estado en arrays indexados por el id del nodo, asi que un id fuera de ese rango
+    # se detecta aqui al cargar en vez de dar un IndexError (o, si es negativo, leer otra posicion) durante la busqueda
+    def comprobar_ids(self):
+        n = self.num_vertices
+        # Los n vertices del .co tienen que ser distintos y estar entre 1 y n
+        if self.coordenadas and (len(self.coordenadas) != n or min(self.coordenadas) < 1 or max(self.coordenadas) > n):
+            raise ValueError(f"los vertices del fichero .co deben tener ids distintos de 1 a {n}")
+        # Los extremos de todos los arcos tienen que ser vertices del .co
+        if self.adyacencia:
+            destinos = list(map(itemgetter(0), chain.from_iterable(self.adyacencia.values())))
+            menor = min(min(self.adyacencia), min(destinos))
+            mayor = max(max(self.adyacencia), max(destinos))
+            if menor < 1 or mayor > n:
+                raise ValueError(f"el fichero .gr tiene arcos con el vertice {menor if menor < 1 else mayor}, "
+                                 f"fuera del rango de vertices 1..{n}")
     
 
     # Funcion que devuelve los vecinos (con sus costes) de un vertice pasado como argumento
@@ -76,31 +120,114 @@ class Grafo:
         return self.adyacencia.get(vertice, [])
     
 
+    # Funcion que devuelve los nodos (con sus costes) desde los que hay un arco hacia el vertice pasado como argumento
+    def obtener_predecesores(self, vertice):
+        # Si aun no se ha construido la adyacencia inversa, se construye recorriendo todos los arcos una vez
+        if self.predecesores is None:
+            predecesores = {}
+            for origen, sucesores in self.adyacencia.items():
+                for destino, coste in sucesores:
+                    if destino not in predecesores:
+                        predecesores[destino] = []
+                    predecesores[destino].append((origen, coste))
+            self.predecesores = predecesores
+        return self.predecesores.get(vertice, [])
+    
+
+    # Funcion que calcula con Dijkstra la distancia desde un vertice a todos los demas (o de todos hasta él si inversa es True)
+    # Devuelve un array indexado por el id del nodo, con -1 en los nodos que no se pueden alcanzar
+    def distancias_desde(self, origen, inversa=False):
+        vecinos = self.obtener_predecesores if inversa else self.obtener_sucesores
+        distancias = array('q', [-1]) * (self.num_vertices + 1)
+        distancias[origen] = 0
+        # Monticulo de enteros que empaquetan (distancia, nodo), con el nodo en los 32 bits bajos
+        monticulo = [origen]
+        while monticulo:
+            clave = heappop(monticulo)
+            nodo = clave & 0xFFFFFFFF
+            distancia = clave >> 32
+            # Entrada obsoleta: el nodo ya se alcanzo despues con menor distancia
+            if distancia != distancias[nodo]:
+                continue
+            for vecino, coste in vecinos(nodo):
+                nueva = distancia + coste
+                if distancias[vecino] < 0 or nueva < distancias[vecino]:
+                    distancias[vecino] = nueva
+                    heappush(monticulo, (nueva << 32) | vecino)
+        return distancias
+
+
+    # Funcion que elige num_landmarks landmarks y guarda las distancias desde y hasta cada uno, para la heuristica ALT
+    # Se eligen por el metodo del mas lejano: cada nuevo landmark es el nodo mas alejado de los ya elegidos
+    def precalcular_landmarks(self, num_landmarks=16):
+        self.landmarks = []
+        if not self.coordenadas:
+            return
+        # El primer landmark es el nodo mas lejano a un nodo cualquiera (el de menor id)
+        lejania = self.distancias_desde(min(self.coordenadas))
+        for _ in range(num_landmarks):
+            landmark = max(range(len(lejania)), key=lejania.__getitem__)
+            # Si ya no queda ningun nodo alcanzable a distancia positiva de los elegidos, no hay mas landmarks utiles
+            if lejania[landmark] <= 0:
+                break
+            desde = self.distancias_desde(landmark)
+            hasta = self.distancias_desde(landmark, inversa=True)
+            self.landmarks.append((landmark, desde, hasta))
+            # La lejania de cada nodo pasa a ser su distancia al landmark mas cercano de los elegidos
+            # (con el primero, su distancia a él, ya que el nodo de partida no es un landmark)
+            if len(self.landmarks) == 1:
+                lejania = array('q', desde)
+            else:
+                for nodo, distancia in enumerate(desde):
+                    if 0 <= distancia < lejania[nodo]:
+                        lejania[nodo] = distancia
+    
+
     # Funcion que calcula la distancia geodésica (linea recta sobre una esfera) entre dos vértices usando la fórmula de Haversine
     # Esta h es admisible porque la distancia estimada nunca será mayor que la distancia real por carretera
     def distancia_haversine(self, v1, v2):
         # v1: Identificador del primer vértice.
         # v2: Identificador del segundo vértice.
         
-        # Se obtienen las coordenadas de los dos nodos
-        lat1, lon1 = self.coordenadas[v1]
-        lat2, lon2 = self.coordenadas[v2]
-        
-        # Se convierten a radianes para poder hacer operaciones trigonometricas con ellos
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lon = math.radians(lon2 - lon1)
+        # Se obtienen las coordenadas de los dos nodos (ya guardadas en radianes al cargarlas)
+        lat1_rad, lon1_rad = self.coordenadas[v1]
+        lat2_rad, lon2_rad = self.coordenadas[v2]
+        delta_lat = lat2_rad - lat1_rad
+        delta_lon = lon2_rad - lon1_rad
         
         # Se aplica la formula de Haversine a los datos
         a = math.sin(delta_lat / 2) ** 2 + \
             math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        # asin(sqrt(a)) es igual a atan2(sqrt(a), sqrt(1 - a)) para a entre 0 y 1, con una raiz menos
+        c = 2 * math.asin(math.sqrt(a))
         
         # Se convierte la distancia a metros multiplicando por el radio de la tierra y se devuelve la distancia final
         return self.RADIO_TIERRA * c
     
 
+    # Funcion que devuelve otra funcion que calcula la distancia Haversine desde cualquier vertice hasta el vertice destino
+    # (pasado como argumento). Es la misma formula que distancia_haversine, pero el coseno de la latitud del destino
+    # se calcula una sola vez
+    def distancia_haversine_a(self, destino):
+        lat2_rad, lon2_rad = self.coordenadas[destino]
+        cos_lat2 = math.cos(lat2_rad)
+        diametro = 2 * self.RADIO_TIERRA
+        # Se guardan en variables locales para no buscarlas en cada llamada
+        coordenadas = self.coordenadas
+        sin = math.sin
+        cos = math.cos
+        asin = math.asin
+        sqrt = math.sqrt
+
+        def distancia(vertice):
+            lat1_rad, lon1_rad = coordenadas[vertice]
+            a = sin((lat2_rad - lat1_rad) / 2) ** 2 + \
+                cos(lat1_rad) * cos_lat2 * sin((lon2_rad - lon1_rad) / 2) ** 2
+            return diametro * asin(sqrt(a))
+
+        return distancia
+    
+
     # Funcion que verifica si existe un vertice en el grafo
     def existe_vertice(self, vertice):
         return vertice in self.coordenadas
@@ -4,36 +4,33 @@
 import sys
 import time
 import os
+from itertools import islice
 
 from grafo import Grafo
 from algoritmo import AlgoritmoAEstrella, AlgoritmoDijkstra
 
+# Directorio del script, donde se buscan el mapa y el fichero de salida cuando no se indica otro directorio
+DIRECTORIO_SCRIPT = os.path.dirname(os.path.abspath(__file__))
 
 # Aquí se ejecuta el codigo principal de la parte 2 del proyecto (la funcion principa es main)
 
 
 
-# Funcion que formatea el camino para escribirlo en el fichero de salida
-def formatear_camino(camino):
-    # Si no hay camino, no se retorna nada
+# Funcion que escribe el camino formateado en el fichero de salida (ya abierto) que se pasa como argumento
+# Cada tramo se escribe directamente en el fichero, sin construir antes una cadena con el camino entero
+def escribir_camino(camino, f):
+    # Si no hay camino, se escribe que no lo hay
     if not camino:
-        return "No hay camino"
-
-    partes = [] # Lista donde se alamcenará cada parte del camino
-    # Recorre cada paso del camino solución
-    for i, (nodo, coste_arco) in enumerate(camino):
-        # Si es el primer nodo se añade tal cual
-        if i == 0:
-            partes.append(str(nodo))
-        # si no es el primer nodo:
-        else:
-            # Añade el coste del tramo entre parentesis
-            partes.append(f"({coste_arco})")
-            #Añade el id del nodo
-            partes.append(str(nodo))
-    
-    # Retorna todos los elementos de partes unidos con guiones
-    return " - ".join(partes)
+        f.write("No hay camino")
+        return
+
+    # El primer nodo se escribe tal cual
+    f.write(str(camino[0][0]))
+    escribir = f.write # se guarda en una variable local para no buscarlo en cada tramo
+    # Recorre el resto de pasos del camino solución (islice los recorre sin copiar la lista)
+    for nodo, coste_arco in islice(camino, 1, None):
+        # Escribe el coste del tramo entre parentesis y el id del nodo, separados por guiones
+        escribir(f" - ({coste_arco}) - {nodo}")
 
 
 
@@ -57,13 +54,17 @@ def main():
     # Se determina la ruta base del mapa
     # Si no tiene directorio, se usa el directorio del script
     if os.path.dirname(nombre_mapa) == '':
-        directorio_script = os.path.dirname(os.path.abspath(__file__))
-        nombre_mapa_completo = os.path.join(directorio_script, nombre_mapa)
+        nombre_mapa_completo = os.path.join(DIRECTORIO_SCRIPT, nombre_mapa)
     else:
         nombre_mapa_completo = nombre_mapa
     
     # Se llama a la funcion cargar, que lee los archivos y carga el grafo 
-    grafo.cargar(nombre_mapa_completo)
+    # Si los ids de los vertices no son validos, se muestra el error y se termina
+    try:
+        grafo.cargar(nombre_mapa_completo)
+    except ValueError as error:
+        print(f"Error: {error}")
+        sys.exit(1)
     
     # Muestra información del grafo
     print(f"# vertices: {grafo.num_vertices}")
@@ -143,14 +144,13 @@ def main():
 
     # Determinar la ruta del fichero de salida
     if os.path.dirname(fichero_salida) == '':
-        directorio_script = os.path.dirname(os.path.abspath(__file__))
-        fichero_salida_completo = os.path.join(directorio_script, fichero_salida)
+        fichero_salida_completo = os.path.join(DIRECTORIO_SCRIPT, fichero_salida)
     else:
         fichero_salida_completo = fichero_salida
-    # Una vez obtenida la ruta del fichero de salida, se escribe en él la solucion llamando a formatear_camino 
+    # Una vez obtenida la ruta del fichero de salida, se escribe en él la solucion llamando a escribir_camino 
     with open(fichero_salida_completo, 'w') as f:
         if camino_astar is not None:
-            f.write(formatear_camino(camino_astar))
+            escribir_camino(camino_astar, f)
             f.write('\n')
         else:
             f.write("No se encontró solución\n")